@@ -1,6 +1,38 @@
+from functools import cached_property
+
+import numpy as np
 import pandas as pd
 
 
+def _weighted_row_sum(returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Sum perfomances multiplied by weights for each row.
+    Columns are added one by one, so the sum is rounded as a plain left-to-right sum.
+    :param returns: 2-D array with perfomances. Columns: assets, rows: dates
+    :param weights: 2-D array with weights of the same shape
+    :return: 1-D array with weighted perfomance for each row
+    """
+    total = np.zeros(returns.shape[0])
+    for j in range(returns.shape[1]):
+        total += returns[:, j] * weights[:, j]
+
+    return total
+
+
+def _cumprod_from_returns(returns: np.ndarray, initial_value: float) -> np.ndarray:
+    """
+    Calculate cumulative perfomance: value[0] = initial_value, value[t] = value[t-1] * (1 + returns[t-1]).
+    :param returns: 1-D array with perfomance for each time t
+    :param initial_value: perfomance value at day 0
+    :return: 1-D array with cumulative perfomance, one element longer than returns
+    """
+    perfomance = np.empty(len(returns) + 1)
+    perfomance[0] = initial_value
+    perfomance[1:] = 1 + returns
+
+    return np.cumprod(perfomance, out=perfomance)
+
+
 class AssetPerfomances:
     """
     Calculate price, currency and total perfomances for each asset.
@@ -16,150 +48,105 @@ class AssetPerfomances:
         • weights.csv Daily portfolio weights. Columns: asset id, rows: dates
         • exchanges.csv Daily exchange rate (to dollar). Columns: currency names, rows: dates
         """
-        self._prices = pd.read_csv('prices.csv', index_col=0)
-        self._exchanges = pd.read_csv('exchanges.csv', index_col=0)
+        self._prices = pd.read_csv('prices.csv', index_col=0, parse_dates=True, dtype=np.float64)
+        self._exchanges = pd.read_csv('exchanges.csv', index_col=0, parse_dates=True, dtype=np.float64)
         self._currencies = pd.read_csv('currencies.csv', index_col=0)
-        self._weights = pd.read_csv('weights.csv', index_col=0)
-
-    @staticmethod
-    def __replace_na_values(column: pd.Series) -> pd.Series:
-        """
-         Replace missing values with the last valid value.
-        :param column: Series with missing values
-        :return: Series after replacement missing values
-        """
-        column.fillna(method='ffill', inplace=True)
-        column.fillna(method='bfill',
-                      inplace=True)  # if elements at start of the column have NaN value, it will be replaced by the 1st valid value in this column
-        return column
+        self._weights = pd.read_csv('weights.csv', index_col=0, parse_dates=True, dtype=np.float64)
+        self._asset_currencies = self._currencies['currency'].reindex(self._prices.columns).fillna('USD')
+        self._prices_daily = self.__get_new_index(self._prices)
+        self._ex_daily = self.__get_new_index(self._exchanges, self._prices_daily.index)
+        self._weights_daily = self.__get_new_index(self._weights)
+        self._ex_by_asset = self.__get_exchanges_for_assets()
 
     @staticmethod
-    def __get_new_index(df: pd.DataFrame) -> pd.DataFrame:
+    def __get_new_index(df: pd.DataFrame, new_index: pd.DatetimeIndex = None) -> pd.DataFrame:
         """
         Some dataframes have different indexes range. Changing index in Dataframe to "daily".
+        Missing values are replaced with the last valid value. If elements at start of the column
+        have NaN value, they are replaced by the 1st valid value in this column.
+        Values are filled before reindexing, so added days just take the previous row.
         :param df: Dataframe with "weekday" range
+        :param new_index: Daily index to align with. Dataframe own range is used by default
         :return: Dataframe with "daily" range
         """
-        new_df = pd.DataFrame(index=pd.date_range(df.index[0], df.index[-1], freq='D'))
-        new_df = new_df.join(df)
+        if new_index is None:
+            new_index = pd.date_range(df.index[0], df.index[-1], freq='D')
+        new_df = df.ffill().bfill().reindex(new_index, method='ffill')
+        if new_index[0] < df.index[0]:
+            new_df = new_df.bfill()  # days before the 1st row of df take its 1st valid value
 
         return new_df
 
-    def __get_series_by_currency(self, asset: str) -> pd.Series:
-        """
-        Get currency values for asset.
-        Catch exception KeyError because Dataframe "currencies" hasn't column with USD currency.
-        :param asset: Current asset
-        :return: Series with currency values for this asset
-        """
-        try:
-            column = self._currencies.loc[asset].values
-            return self._exchanges[column].squeeze()
-        except KeyError:
-            return pd.Series([1] * len(self._exchanges), index=self._exchanges.index)
-
-    def __count_return_prices_for_asset(self, asset: str) -> pd.Series:
+    @staticmethod
+    def __count_perfomance(values: np.ndarray) -> np.ndarray:
         """
-        Calculate return price for asset.
-        :param asset: Current asset
-        :return: Series with price perfomance for this asset
+        Calculate perfomance for each column as (value[t] - value[t-1]) / value[t-1].
+        pct_change() isn't used because value[t] / value[t-1] - 1 is rounded differently.
+        Result is written into one column-major array, which Dataframe takes as a single block without copy.
+        :param values: 2-D array with values. Columns: assets, rows: dates
+        :return: 2-D array with perfomance without 1st row
         """
-        self.__new_prices = self.__get_new_index(self._prices)
-        self.__new_prices = self.__replace_na_values(self.__new_prices[asset])
-        perfomance_for_asset = []
+        perfomance = np.empty((values.shape[0] - 1, values.shape[1]), order='F')
+        np.subtract(values[1:], values[:-1], out=perfomance)
 
-        for i in range(1, len(self.__new_prices)):
-            perfomance_for_asset.append((self.__new_prices.iloc[i] - self.__new_prices.iloc[
-                i - 1]) / self.__new_prices.iloc[i - 1])
+        return np.divide(perfomance, values[:-1], out=perfomance)
 
-        return pd.Series(perfomance_for_asset)
-
-    def __count_currency_perfomance_for_asset(self, asset: str) -> pd.Series:
+    def __get_perfomance_df(self, values: np.ndarray) -> pd.DataFrame:
         """
-        Calculate currency perfomance for asset.
-        :param asset: Current asset
-        :return: Series with currency perfomance for this asset
+        Calculate perfomance for daily values of all assets and wrap it into Dataframe.
+        copy=False is passed because newer pandas copies ndarrays by default.
+        :param values: 2-D array with daily values. Columns: assets, rows: dates
+        :return: Dataframe with perfomance for each asset
         """
-        cur_currency = self._currencies.loc[asset].values[0]
-        if cur_currency == 'USD':
-            return pd.Series([0] * (len(self._exchanges) - 1))
-        self.__new_exchanges = self.__replace_na_values(self._exchanges[cur_currency])
-        perfomance_for_asset = []
-
-        for i in range(1, len(self.__new_exchanges)):
-            perfomance_for_asset.append((self.__new_exchanges.iloc[i] - self.__new_exchanges.iloc[
-                i - 1]) / self.__new_exchanges.iloc[i - 1])
+        return pd.DataFrame(self.__count_perfomance(values), index=self._prices_daily.index[1:],
+                            columns=self._prices_daily.columns, copy=False)
 
-        return pd.Series(perfomance_for_asset)
-
-    def __count_total_perfomance_for_asset(self, asset: str) -> pd.Series:
+    def __get_exchanges_for_assets(self) -> pd.DataFrame:
         """
-        Calculate total perfomance for asset.
-        :param asset: Current asset
-        :return: Series with total perfomance for asset
+        Get exchange rates for each asset according on its currency.
+        Dataframe "exchanges" hasn't column with USD currency, so all USD assets share one column of ones.
+        :return: Dataframe with exchange rates. Columns: asset ids, rows: dates of daily prices
         """
-        self.__new_prices = self.__get_new_index(self._prices)
-        self.__new_prices = self.__replace_na_values(self.__new_prices[asset]).values
-        perfomance_for_asset = []
-
-        self.__currency_for_asset = self.__get_series_by_currency(asset).values
+        usd_ones = np.ones(len(self._ex_daily))
 
-        for i in range(1, len(self.__new_prices)):
-            value1 = self.__currency_for_asset[i] * self.__new_prices[i]
-            value2 = self.__currency_for_asset[i - 1] * self.__new_prices[i - 1]
-            perfomance_for_asset.append((value1 - value2) / value2)
-
-        return pd.Series(perfomance_for_asset)
+        return pd.DataFrame({asset: usd_ones if currency == 'USD' else self._ex_daily[currency].to_numpy()
+                             for asset, currency in self._asset_currencies.items()},
+                            index=self._ex_daily.index)
 
     def _calculate_price_perfomance_for_all_assets(self) -> pd.DataFrame:
         """
         Calculate price perfomance for all assets.
         :return: Dataframe with price perfomance for each asset.
         """
-        price_perform_df = pd.DataFrame()
-
-        for column in self._prices.columns:
-            price_perform_df[column] = self.__count_return_prices_for_asset(column)
-        price_perform_df.index = self.__get_new_index(self._prices).index[1:]
-        return price_perform_df
+        return self.__get_perfomance_df(self._prices_daily.to_numpy())
 
     def _calculate_currency_perfomance_for_all_assets(self) -> pd.DataFrame:
         """
         Calculate currency perfomance for all assets.
+        Perfomance is calculated once for each currency and copied to all assets with this currency.
+        USD perfomance is always 0.
         :return: Dataframe with currency perfomance for each asset.
         """
-        currency_perform_df = pd.DataFrame()
+        currency_perform_df = pd.DataFrame(self.__count_perfomance(self._ex_daily.to_numpy()),
+                                           index=self._ex_daily.index[1:], columns=self._ex_daily.columns)
+        currency_perform_df['USD'] = 0.0
 
-        for column in self._prices.columns:
-            currency_perform_df[column] = self.__count_currency_perfomance_for_asset(column)
-        currency_perform_df.index = self.__get_new_index(self._exchanges).index[1:]
-
-        return currency_perform_df
+        return currency_perform_df.reindex(columns=self._asset_currencies.to_numpy()).set_axis(
+            self._prices_daily.columns, axis=1)
 
     def _calculate_total_perfomance_for_all_assets(self) -> pd.DataFrame:
         """
         Calculate total perfomance for all assets.
         :return: Dataframe with total perfomance for each asset.
         """
-        total_perform_df = pd.DataFrame()
-
-        for column in self._prices.columns:
-            total_perform_df[column] = self.__count_total_perfomance_for_asset(column)
-        total_perform_df.index = self.__get_new_index(self._prices).index[1:]
-
-        return total_perform_df
+        return self.__get_perfomance_df(self._prices_daily.to_numpy() * self._ex_by_asset.to_numpy())
 
     def _prepare_weights_df(self) -> pd.DataFrame:
         """
         "Weights" dataframe also has "weekday" index range. Change it to "daily"
         :return: Weights dataframe with "daily" index range
         """
-        self.__new_weights = self.__get_new_index(self._weights)
-        self.__new_weights.fillna(method='ffill', inplace=True)
-        self.__new_weights.fillna(method='bfill',
-                                  inplace=True)
-
-        return self.__new_weights.iloc[:-1]
+        return self._weights_daily.iloc[:-1]
 
 
 class PerfomancesWithWeights(AssetPerfomances):
@@ -168,48 +155,60 @@ class PerfomancesWithWeights(AssetPerfomances):
     All function with used in next calculations data  have "protected" visible.
     """
 
-    def __init__(self) -> None:
+    @cached_property
+    def __rt(self) -> pd.DataFrame:
         """
-        Get calculated perfomances and "weights" dataframe from inheritable class.
+        Price perfomance for all assets. Calculated on first access.
         """
-        super().__init__()
-        self.__rt = super()._calculate_price_perfomance_for_all_assets()
-        self.__crt = super()._calculate_currency_perfomance_for_all_assets()
-        self.__trt = super()._calculate_total_perfomance_for_all_assets()
-        self.__weights = super()._prepare_weights_df()
+        return self._calculate_price_perfomance_for_all_assets()
+
+    @cached_property
+    def __crt(self) -> pd.DataFrame:
+        """
+        Currency perfomance for all assets. Calculated on first access.
+        """
+        return self._calculate_currency_perfomance_for_all_assets()
+
+    @cached_property
+    def __trt(self) -> pd.DataFrame:
+        """
+        Total perfomance for all assets. Calculated on first access.
+        """
+        return self._calculate_total_perfomance_for_all_assets()
+
+    @cached_property
+    def __weights(self) -> pd.DataFrame:
+        """
+        "Weights" dataframe with "daily" index range. Calculated on first access.
+        """
+        return self._prepare_weights_df()
 
     def _calculate_price_perfomance_according_on_weights(self) -> pd.Series:
         """
         Calculate price perfomance for all assets according on their weights.
         :return: Series with price perfomance for each time t.
         """
-        self.__rt_with_weights = self.__rt * self.__weights
-        price_perform_for_each_t = [sum(self.__rt_with_weights.iloc[i].values) for i in
-                                    range(len(self.__rt_with_weights))]
+        perfomance, weights = self.__rt.align(self.__weights)
 
-        return pd.Series(price_perform_for_each_t, index=self.__rt_with_weights.index)
+        return pd.Series(_weighted_row_sum(perfomance.to_numpy(), weights.to_numpy()), index=perfomance.index)
 
     def _calculate_currency_perfomance_according_on_weights(self) -> pd.Series:
         """
         Calculate currency perfomance for all assets according on their weights.
         :return: Series with currency perfomance for each time t.
         """
-        self.__crt_with_weights = self.__crt * self.__weights
-        currency_perform_for_each_t = [sum(self.__crt_with_weights.iloc[i].values) for i in
-                                       range(len(self.__crt_with_weights))]
+        perfomance, weights = self.__crt.align(self.__weights)
 
-        return pd.Series(currency_perform_for_each_t, index=self.__crt_with_weights.index)
+        return pd.Series(_weighted_row_sum(perfomance.to_numpy(), weights.to_numpy()), index=perfomance.index)
 
     def _calculate_total_perfomance_according_on_weights(self) -> pd.Series:
         """
         Calculate total perfomance for all assets according on their weights.
         :return: Series with total perfomance for each time t.
         """
-        self.__trt_with_weights = self.__trt * self.__weights
-        total_perform_for_each_t = [sum(self.__trt_with_weights.iloc[i].values) for i in
-                                    range(len(self.__trt_with_weights))]
+        perfomance, weights = self.__trt.align(self.__weights)
 
-        return pd.Series(total_perform_for_each_t, index=self.__trt_with_weights.index)
+        return pd.Series(_weighted_row_sum(perfomance.to_numpy(), weights.to_numpy()), index=perfomance.index)
 
 
 class TotalPerfomance(PerfomancesWithWeights):
@@ -221,16 +220,60 @@ class TotalPerfomance(PerfomancesWithWeights):
 
     def __init__(self) -> None:
         """
-        Get calculated perfomances from inheritable class. Set default perfomance value at day 0.
+        Set default perfomance value at day 0.
+        Perfomances from inheritable class are calculated on first access.
         """
         super().__init__()
-        self.__res_t = super()._calculate_price_perfomance_according_on_weights()
-        self.__currency_res_t = super()._calculate_currency_perfomance_according_on_weights()
-        self.__total_res_t = super()._calculate_total_perfomance_according_on_weights()
         self.__P = 1
         self.__CP = 1
         self.__TP = 1
 
+    @cached_property
+    def __res_t(self) -> pd.Series:
+        """
+        Price perfomance according on weights for each time t. Calculated on first access.
+        """
+        return self._calculate_price_perfomance_according_on_weights()
+
+    @cached_property
+    def __currency_res_t(self) -> pd.Series:
+        """
+        Currency perfomance according on weights for each time t. Calculated on first access.
+        """
+        return self._calculate_currency_perfomance_according_on_weights()
+
+    @cached_property
+    def __total_res_t(self) -> pd.Series:
+        """
+        Total perfomance according on weights for each time t. Calculated on first access.
+        """
+        return self._calculate_total_perfomance_according_on_weights()
+
+    @staticmethod
+    def __check_dates_order(start_date: str, end_date: str) -> None:
+        """
+        Check that start_date isn't later than end_date.
+        Runs before the dates lookup, so a reversed range raises ValueError even if dates are out of range.
+        Unparseable date raises KeyError.
+        :param start_date: Converted to str datetime parameter.
+        :param end_date: Converted to str datetime parameter.
+        """
+        if TotalPerfomance.__parse_date(start_date) > TotalPerfomance.__parse_date(end_date):
+            raise ValueError(f'start_date {start_date} is later than end_date {end_date}')
+
+    @staticmethod
+    def __parse_date(date: str) -> pd.Timestamp:
+        """
+        Convert date to Timestamp.
+        Unparseable date raises KeyError, the same as a date which isn't in the Series.
+        :param date: Converted to str datetime parameter.
+        :return: Timestamp of date.
+        """
+        try:
+            return pd.Timestamp(date)
+        except ValueError:
+            raise KeyError(date) from None
+
     @staticmethod
     def __get_index_of_start_date_element(column: pd.Series, start_date: str) -> int:
         """
@@ -239,7 +282,12 @@ class TotalPerfomance(PerfomancesWithWeights):
         :param start_date: Converted to str datetime parameter.
         :return: int index of start_date.
         """
-        return column.index.get_loc(start_date)
+        date = TotalPerfomance.__parse_date(start_date)
+        index = column.index.searchsorted(date)
+        if index == len(column) or column.index[index] != date:
+            raise KeyError(start_date)
+
+        return index
 
     @staticmethod
     def __get_index_of_end_date_element(column: pd.Series, end_date: str) -> int:
@@ -249,7 +297,26 @@ class TotalPerfomance(PerfomancesWithWeights):
         :param end_date: Converted to str datetime parameter.
         :return: int index of end_date.
         """
-        return column.index.get_loc(end_date)
+        date = TotalPerfomance.__parse_date(end_date)
+        index = column.index.searchsorted(date, side='right') - 1
+        if index < 0 or column.index[index] != date:
+            raise KeyError(end_date)
+
+        return index
+
+    @staticmethod
+    def __get_cumulative_perfomance(column: pd.Series, start: int, end: int, initial_value: float) -> pd.Series:
+        """
+        Calculate cumulative perfomance from start to end: value[t] = value[t-1] * (1 + column[t]).
+        :param column: Selected Series with perfomance for each time t.
+        :param start: int index of start date.
+        :param end: int index of end date.
+        :param initial_value: perfomance value at start date.
+        :return: Series with cumulative perfomance.
+        """
+        perfomance = _cumprod_from_returns(column.to_numpy()[start + 1:end + 1], initial_value)
+
+        return pd.Series(perfomance, index=column.index[start:end + 1])
 
     def calculate_asset_performance(self, start_date: str, end_date: str) -> pd.Series:
         """
@@ -258,15 +325,11 @@ class TotalPerfomance(PerfomancesWithWeights):
         :param end_date: 2nd parameter. Has converted to str datetime type.
         :return: Series with asset perfomance.
         """
-        asset_performance = [1]
+        self.__check_dates_order(start_date, end_date)
         start = self.__get_index_of_start_date_element(self.__res_t, start_date)
         end = self.__get_index_of_end_date_element(self.__res_t, end_date)
-        for i in range(start + 1, end + 1):
-            as_perform = asset_performance[-1] * (1 + self.__res_t.iloc[i])
-            asset_performance.append(as_perform)
-        overall_asset = pd.Series(asset_performance, index=self.__res_t.loc[start_date:end_date].index)
 
-        return overall_asset
+        return self.__get_cumulative_perfomance(self.__res_t, start, end, self.__P)
 
     def calculate_currency_performance(self, start_date: str, end_date: str) -> pd.Series:
         """
@@ -275,14 +338,11 @@ class TotalPerfomance(PerfomancesWithWeights):
         :param end_date: 2nd parameter. Has converted to str datetime type.
         :return: Series with currency perfomance.
         """
-        currency_performance = [self.__CP]
+        self.__check_dates_order(start_date, end_date)
         start = self.__get_index_of_start_date_element(self.__currency_res_t, start_date)
         end = self.__get_index_of_end_date_element(self.__currency_res_t, end_date)
-        for i in range(start + 1, end + 1):
-            currency_performance.append(currency_performance[-1] * (1 + self.__currency_res_t.iloc[i]))
-        overall_currency = pd.Series(currency_performance, index=self.__currency_res_t.loc[start_date:end_date].index)
 
-        return overall_currency
+        return self.__get_cumulative_perfomance(self.__currency_res_t, start, end, self.__CP)
 
     def calculate_total_performance(self, start_date: str, end_date: str) -> pd.Series:
         """
@@ -291,11 +351,8 @@ class TotalPerfomance(PerfomancesWithWeights):
         :param end_date: 2nd parameter. Has converted to str datetime type.
         :return: Series with total perfomance.
         """
-        total_performance = [self.__TP]
+        self.__check_dates_order(start_date, end_date)
         start = self.__get_index_of_start_date_element(self.__total_res_t, start_date)
         end = self.__get_index_of_end_date_element(self.__total_res_t, end_date)
-        for i in range(start + 1, end + 1):
-            total_performance.append(total_performance[-1] * (1 + self.__total_res_t.iloc[i]))
-        overall_total_perform = pd.Series(total_performance, index=self.__total_res_t.loc[start_date:end_date].index)
 
-        return overall_total_perform
+        return self.__get_cumulative_perfomance(self.__total_res_t, start, end, self.__TP)
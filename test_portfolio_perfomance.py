@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 import portfolio_perfomance
 
@@ -15,9 +18,27 @@ class TotalPerfomanceTest(unittest.TestCase):
         with self.assertRaises(KeyError):
             count_perfomance.calculate_asset_performance('2014-01-12', '2014-02-09')
 
+        with self.assertRaises(KeyError):
+            count_perfomance.calculate_asset_performance('2018-03-10', '2018-03-12')
+
+        with self.assertRaises(KeyError):
+            count_perfomance.calculate_asset_performance('2018-03-01', '2018-03-10')
+
+        with self.assertRaises(KeyError):
+            count_perfomance.calculate_asset_performance('2014-01-01', '2014-01-05')
+
         with self.assertRaises(ValueError):
             count_perfomance.calculate_asset_performance('2014-04-11', '2014-03-09')
 
+        with self.assertRaises(ValueError):
+            count_perfomance.calculate_asset_performance('2020-01-01', '2012-01-01')
+
+        with self.assertRaises(KeyError):
+            count_perfomance.calculate_asset_performance('garbage', '2014-02-01')
+
+        one_day_result = count_perfomance.calculate_asset_performance('2014-02-01', '2014-02-01')
+        self.assertEqual(list(one_day_result), [1.0])
+
     def test_calculate_currency_performance(self):
         count_perfomance = portfolio_perfomance.TotalPerfomance()
         currency_result = count_perfomance.calculate_currency_performance('2014-01-25', '2014-04-15')
@@ -47,5 +68,54 @@ class TotalPerfomanceTest(unittest.TestCase):
             count_perfomance.calculate_total_performance('2017-03-10', '2017-03-09')
 
 
+    def test_asset_performance_is_calculated_lazily(self):
+        count_perfomance = portfolio_perfomance.TotalPerfomance()
+        count_perfomance.calculate_asset_performance('2014-01-18', '2014-02-09')
+        self.assertIn('_PerfomancesWithWeights__rt', vars(count_perfomance))
+        self.assertNotIn('_PerfomancesWithWeights__crt', vars(count_perfomance))
+        self.assertNotIn('_PerfomancesWithWeights__trt', vars(count_perfomance))
+        self.assertNotIn('_TotalPerfomance__currency_res_t', vars(count_perfomance))
+        self.assertNotIn('_TotalPerfomance__total_res_t', vars(count_perfomance))
+
+class AssetPerfomancesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.data_dir = tempfile.mkdtemp()
+        for file_name in ('prices.csv', 'exchanges.csv', 'currencies.csv', 'weights.csv'):
+            shutil.copy(file_name, self.data_dir)
+        os.chdir(self.data_dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.data_dir)
+
+    @staticmethod
+    def drop_csv_lines(file_name, first, last):
+        with open(file_name) as f:
+            lines = f.readlines()
+        with open(file_name, 'w') as f:
+            f.writelines(lines[:first] + lines[last:])
+
+    def test_exchanges_with_shorter_range(self):
+        self.drop_csv_lines('exchanges.csv', 1, 11)
+        count_perfomance = portfolio_perfomance.TotalPerfomance()
+        self.assertFalse(count_perfomance._ex_daily.isna().any().any())
+
+        currency_result = count_perfomance.calculate_currency_performance('2014-01-14', '2014-01-30')
+        total_result = count_perfomance.calculate_total_performance('2014-01-14', '2014-01-30')
+        self.assertFalse(currency_result.isna().any())
+        self.assertFalse(total_result.isna().any())
+
+
+    def test_currency_perfomance_for_assets(self):
+        self.drop_csv_lines('currencies.csv', 5, 6)  # "US6092071058 US" hasn't currency
+        currency_perform_df = portfolio_perfomance.AssetPerfomances()._calculate_currency_perfomance_for_all_assets()
+        self.assertTrue(currency_perform_df['BE0974268972 BB'].equals(currency_perform_df['DE0007164600 GR']))
+        self.assertFalse(currency_perform_df['AT0000A18XM4 SW'].equals(currency_perform_df['BE0974268972 BB']))
+        self.assertTrue((currency_perform_df['US0527691069 US'] == 0.0).all())
+        self.assertTrue((currency_perform_df['US6092071058 US'] == 0.0).all())
+
+
 if __name__ == '__main__':
     unittest.main()